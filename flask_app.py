@@ -3,33 +3,72 @@ UHI-Monitor Flask Application
 Professional web interface for Urban Heat Island monitoring
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, send_file
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 import datetime
 import numpy as np
 import base64
 from io import BytesIO
 from PIL import Image
+import os
 import traceback
+import uuid
 
-from src.utils import search_locations, get_city_bbox, reverse_geocode
+import diskcache
+import orjson
+
+# Local caches live under <project>/.cache regardless of the working directory
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+# Pin Numba's compile cache to the project (must be set before numba is imported)
+# so compiled kernels survive container restarts when .cache is a mounted volume
+os.environ.setdefault('NUMBA_CACHE_DIR', os.path.join(CACHE_DIR, 'numba'))
+
+# The parallel kernels run from concurrent request threads; only the TBB/OpenMP
+# layers allow that (workqueue aborts the process on concurrent access)
+os.environ.setdefault('NUMBA_THREADING_LAYER', 'threadsafe')
+
+from src.utils import search_locations, get_city_bbox, reverse_geocode, warm_up_bbox_kernels
 from src.data_loader import fetch_landsat_data
 from src.processor import (
-    calculate_lst, 
-    calculate_ndvi, 
+    IMAGE_FORMATS,
+    warm_up_kernels,
+    extract_bands,
+    process_scene,
     generate_lst_image, 
     generate_ndvi_image,
-    calculate_statistics,
-    lst_ndvi_correlation
+    calculate_statistics
 )
 
+
+class ORJSONProvider(JSONProvider):
+    """JSON provider backed by orjson; serializes NumPy scalars and arrays natively"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 CORS(app)  # Enable CORS for API endpoints
 
 # Configure Flask
 app.config['JSON_SORT_KEYS'] = False
 app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
 
+# Rendered overlay images served by /api/tile/<uid>: uid -> (image_bytes, mimetype)
+# On disk so every worker process (e.g. gunicorn -w 4) sees tiles stored by the others
+TILE_TTL = 600  # seconds
+_tile_cache = diskcache.Cache(os.path.join(CACHE_DIR, 'tiles'), size_limit=512 * 2**20)
+
+# Pay the JIT cost at boot rather than on the first /api/analyze request
+warm_up_kernels()
+warm_up_bbox_kernels()
+
 
 @app.route('/')
 def index():
@@ -158,25 +197,21 @@ def analyze():
         "max_cloud_cover": 15
     }
     
-    Response JSON:
-    {
-        "success": true,
-        "data": {
-            "scene_date": "2024-07-15",
-            "cloud_cover": 5.2,
-            "lst": {
-                "image": "base64_encoded_png",
-                "bounds": [[minLat, minLon], [maxLat, maxLon]],
-                "statistics": {...}
-            },
-            "ndvi": {
-                "image": "base64_encoded_png",
-                "bounds": [[minLat, minLon], [maxLat, maxLon]],
-                "statistics": {...}
-            },
-            "correlation": -0.72
-        }
-    }
+    Query parameters:
+    format : "webp" (default) or "png" for clients without WebP support
+    
+    Response (application/x-ndjson), one JSON object per line as each stage completes:
+    {"stage": "scene", "scene_date": "2024-07-15", "cloud_cover": 5.2}
+    {"stage": "lst", "image_url": "/api/tile/<uid>", "bounds": [[minLat, minLon], [maxLat, maxLon]],
+     "statistics": {...}, "uhi_magnitude": 12.3}
+    {"stage": "ndvi", "image_url": "/api/tile/<uid>", "bounds": [[minLat, minLon], [maxLat, maxLon]],
+     "statistics": {...}}
+    {"stage": "correlation", "correlation": -0.72}
+    {"stage": "done"}
+    
+    Image URLs stay valid for TILE_TTL seconds.
+    A failure after streaming has started is reported as {"stage": "error", "error": "..."}.
+    Validation errors and "no data found" are returned as regular JSON before streaming.
     """
     try:
         data = request.get_json()
@@ -186,6 +221,13 @@ def analyze():
         start_date = data.get('start_date')
         end_date = data.get('end_date')
         max_cloud_cover = data.get('max_cloud_cover', 15)
+        image_format = request.args.get('format', 'webp').lower()
+        
+        if image_format not in IMAGE_FORMATS:
+            return jsonify({
+                'success': False,
+                'error': f'Unsupported image format "{image_format}"'
+            }), 400
         
         if not bbox or len(bbox) != 4:
             return jsonify({
@@ -201,7 +243,7 @@ def analyze():
         
         print(f"Analyzing region: bbox={bbox}, dates={start_date} to {end_date}")
         
-        # Fetch satellite data
+        # Fetch satellite data (lazy: only the STAC search happens here)
         ds = fetch_landsat_data(bbox, start_date, end_date, max_cloud_cover)
         
         if ds is None:
@@ -210,65 +252,100 @@ def analyze():
                 'error': 'No suitable satellite data found. Try increasing cloud cover tolerance or expanding date range.'
             }), 404
         
+    except Exception as e:
+        print(f"Error in analyze: {e}")
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error': f'Analysis failed: {str(e)}'
+        }), 500
+    
+    return Response(_analyze_stream(ds, start_date, max_cloud_cover, image_format), mimetype='application/x-ndjson')
+
+
+@app.route('/api/tile/<uid>', methods=['GET'])
+def tile(uid):
+    """Serve a rendered overlay image produced by /api/analyze"""
+    entry = _tile_cache.get(uid)
+    
+    if entry is None:
+        return jsonify({
+            'success': False,
+            'error': 'Image not found or expired. Please re-run the analysis.'
+        }), 404
+    
+    image_bytes, mimetype = entry
+    return send_file(BytesIO(image_bytes), mimetype=mimetype, max_age=TILE_TTL)
+
+
+def _store_tile(image_bytes, image_format):
+    """Stash a rendered image in the tile cache and return its URL"""
+    uid = uuid.uuid4().hex
+    _tile_cache.set(uid, (image_bytes, f'image/{image_format}'), expire=TILE_TTL)
+    return f'/api/tile/{uid}'
+
+
+def _ndjson(stage, **payload):
+    """Serialize one stage of the analyze stream as an NDJSON line"""
+    return app.json.dumps({'stage': stage, **payload}) + '\n'
+
+
+def _analyze_stream(ds, start_date, max_cloud_cover, image_format):
+    """Generator behind /api/analyze, yields each stage as soon as it is ready"""
+    try:
         # Select first (clearest) scene if multiple exist
         if 'time' in ds.dims:
             scene = ds.isel(time=0)
-            scene_date = str(scene.time.values)[:10]
+            scene_date = str(np.datetime_as_string(scene.time.values, unit='D'))
         else:
             scene = ds
             scene_date = start_date
         
-        # Calculate LST and NDVI
+        yield _ndjson(
+            'scene',
+            scene_date=scene_date,
+            cloud_cover=float(max_cloud_cover)  # Could extract actual cloud cover from metadata
+        )
+        
+        # Read the bands once, then calculate LST, NDVI and their correlation in a single pass
         print("Calculating LST and NDVI...")
-        lst = calculate_lst(scene)
-        ndvi = calculate_ndvi(scene)
+        bands = extract_bands(scene)
+        lst, ndvi, correlation = process_scene(scene, bands)
         
-        # Generate images
+        # LST first so the map overlay can render while NDVI is still being prepared
         print("Generating visualization images...")
-        lst_image_b64, lst_bounds = generate_lst_image(lst)
-        ndvi_image_b64, ndvi_bounds = generate_ndvi_image(ndvi)
-        
+        lst_image, lst_bounds = generate_lst_image(lst, image_format)
+        lst_stats = calculate_statistics(lst)
         print(f"Generated LST bounds: {lst_bounds}")
-        print(f"Generated NDVI bounds: {ndvi_bounds}")
         
-        # Calculate statistics
-        lst_stats = calculate_statistics(lst)
+        yield _ndjson(
+            'lst',
+            image_url=_store_tile(lst_image, image_format),
+            bounds=lst_bounds,
+            statistics=lst_stats,
+            uhi_magnitude=lst_stats['max'] - lst_stats['min']
+        )
+        
+        ndvi_image, ndvi_bounds = generate_ndvi_image(ndvi, image_format)
         ndvi_stats = calculate_statistics(ndvi)
+        print(f"Generated NDVI bounds: {ndvi_bounds}")
         
-        # Calculate correlation
-        correlation = lst_ndvi_correlation(lst, ndvi)
+        yield _ndjson(
+            'ndvi',
+            image_url=_store_tile(ndvi_image, image_format),
+            bounds=ndvi_bounds,
+            statistics=ndvi_stats
+        )
         
-        # Prepare response
-        response_data = {
-            'success': True,
-            'data': {
-                'scene_date': scene_date,
-                'cloud_cover': float(max_cloud_cover),  # Could extract actual cloud cover from metadata
-                'lst': {
-                    'image': lst_image_b64,
-                    'bounds': lst_bounds,
-                    'statistics': lst_stats
-                },
-                'ndvi': {
-                    'image': ndvi_image_b64,
-                    'bounds': ndvi_bounds,
-                    'statistics': ndvi_stats
-                },
-                'correlation': correlation,
-                'uhi_magnitude': lst_stats['max'] - lst_stats['min']
-            }
-        }
+        yield _ndjson('correlation', correlation=correlation)
         
         print("Analysis complete!")
-        return jsonify(response_data)
+        yield _ndjson('done')
         
     except Exception as e:
         print(f"Error in analyze: {e}")
         traceback.print_exc()
-        return jsonify({
-            'success': False,
-            'error': f'Analysis failed: {str(e)}'
-        }), 500
+        yield _ndjson('error', error=f'Analysis failed: {str(e)}')
 
 
 if __name__ == '__main__':
@@ -1,16 +1,44 @@
+import threading
+
 import pystac_client
+from pystac_client.stac_api_io import StacApiIO
 import planetary_computer
 from odc.stac import load
 import pandas as pd
+from requests.adapters import HTTPAdapter
+
+STAC_URL = "https://planetarycomputer.microsoft.com/api/stac/v1"
+
+# Shared STAC client: opened once per process so every search reuses the same
+# requests.Session and its warm keep-alive connections
+_CATALOG = None
+_CATALOG_LOCK = threading.Lock()
+
+
+def _get_catalog():
+    """
+    Returns the shared Planetary Computer STAC client, opening it on first use.
+    """
+    global _CATALOG
+    if _CATALOG is None:
+        with _CATALOG_LOCK:
+            if _CATALOG is None:
+                stac_io = StacApiIO()
+                adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=3)
+                stac_io.session.mount("https://", adapter)
+                _CATALOG = pystac_client.Client.open(
+                    STAC_URL,
+                    modifier=planetary_computer.sign_inplace,
+                    stac_io=stac_io
+                )
+    return _CATALOG
+
 
 def fetch_landsat_data(bbox, start_date, end_date, max_cloud_cover=20):
     """
     Fetches Landsat 8/9 Level 2 data from Microsoft Planetary Computer.
     """
-    catalog = pystac_client.Client.open(
-        "https://planetarycomputer.microsoft.com/api/stac/v1",
-        modifier=planetary_computer.sign_inplace
-    )
+    catalog = _get_catalog()
     
     time_range = f"{start_date}/{end_date}"
     
@@ -38,12 +66,15 @@ def fetch_landsat_data(bbox, start_date, end_date, max_cloud_cover=20):
     # lwir11: Thermal Infrared (Band 10)
     # qa_pixel: Quality Assessment
     
+    # chunks= keeps the load lazy (dask-backed); pixels are only read from the
+    # COGs once the bands are computed, and tiles are then fetched in parallel.
     data = load(
         selected_items,
         bbox=bbox,
         bands=["red", "nir08", "lwir11", "qa_pixel"],
         resolution=0.0003,  # ~30m in degrees for WGS84
-        crs="EPSG:4326"  # WGS84 for Leaflet compatibility
+        crs="EPSG:4326",  # WGS84 for Leaflet compatibility
+        chunks={"time": 1, "x": 1024, "y": 1024}
     )
     
     return data
@@ -1,79 +1,501 @@
 """
 Data processing functions for LST and NDVI calculations
 """
+import threading
+
 import xarray as xr
 import numpy as np
 import matplotlib
 matplotlib.use('Agg')  # Non-GUI backend for server
-import matplotlib.pyplot as plt
-from matplotlib.colors import LinearSegmentedColormap
-import base64
 from io import BytesIO
 from PIL import Image
+from numba import njit, prange, get_num_threads
 
 
-def calculate_lst(ds):
+# Per-pixel Collection 2 Level 2 formulas, the single source of truth for every
+# kernel below. inline='always' splices them into the callers' loops at compile time.
+@njit(inline='always')
+def _dn_to_celsius(dn):
     """
-    Calculates Land Surface Temperature in Celsius from Landsat Level 2 'lwir11' band.
-    Formula: Kelvin = DN * 0.003418 + 149.0
-    Celsius = Kelvin - 273.15
+    Surface temperature DN -> Celsius.
+    DN * 0.003418 + 149.0 - 273.15 == DN * 0.003418 - 124.15
+    """
+    return dn * 0.003418 - 124.15
+
+
+@njit(inline='always')
+def _lst_valid(t):
+    """
+    0 DN translates to ~149K or -124C. Real earth temps rarely go below -90C,
+    so anything at or below -100C is treated as no-data or background.
+    """
+    return t > -100.0
+
+
+@njit(inline='always')
+def _dn_to_ndvi(nir_dn, red_dn):
+    """
+    Surface reflectance DNs -> NDVI, reflectance = DN * 2.75e-5 - 0.2.
+    The epsilon avoids division by zero.
+    """
+    nir = nir_dn * 2.75e-5 - 0.2
+    red = red_dn * 2.75e-5 - 0.2
+    return (nir - red) / (nir + red + 1e-6)
+
+
+@njit(inline='always')
+def _ndvi_valid(v):
+    """
+    Valid NDVI lies strictly inside (-1, 1).
+    """
+    return -1.0 < v < 1.0
+
+
+# The request-path kernels carry explicit signatures (uint16 DN in, float32 out),
+# so they compile eagerly at import and are loaded from the on-disk cache after
+# the first run. The remaining kernels compile lazily; see warm_up_kernels().
+@njit('float32[:, ::1](uint16[:, ::1], float32[:, ::1])', parallel=True, fastmath=True, cache=True)
+def _lst_kernel(lwir, out):
+    """
+    Fused DN -> Celsius conversion with the no-data mask, one pass over the band.
+    """
+    rows, cols = lwir.shape
+    for i in prange(rows):
+        for j in range(cols):
+            t = _dn_to_celsius(lwir[i, j])
+            out[i, j] = t if _lst_valid(t) else np.nan
+    return out
+
+
+@njit('float32[:, ::1](uint16[:, ::1], uint16[:, ::1], float32[:, ::1])', parallel=True, fastmath=True, cache=True)
+def _ndvi_kernel(nir, red, out):
+    """
+    Fused reflectance scaling, NDVI ratio and [-1, 1] mask, one pass over both bands.
+    """
+    rows, cols = nir.shape
+    for i in prange(rows):
+        for j in range(cols):
+            v = _dn_to_ndvi(nir[i, j], red[i, j])
+            out[i, j] = v if _ndvi_valid(v) else np.nan
+    return out
+
+
+@njit('Tuple((float64, float64, float64, float64, float64, int64))'
+      '(uint16[:, ::1], uint16[:, ::1], uint16[:, ::1], float32[:, ::1], float32[:, ::1])',
+      parallel=True, fastmath=True, cache=True)
+def _lst_ndvi_corr(lwir, nir, red, lst_out, ndvi_out):
+    """
+    Fused LST + NDVI computation that also accumulates the Pearson sums
+    over pixels valid in both products, one pass over the three bands.
+    Returns (sx, sy, sxx, syy, sxy, n) with x = LST and y = NDVI.
+    """
+    rows, cols = lwir.shape
+    sx = 0.0
+    sy = 0.0
+    sxx = 0.0
+    syy = 0.0
+    sxy = 0.0
+    n = 0
+    for i in prange(rows):
+        for j in range(cols):
+            t = _dn_to_celsius(lwir[i, j])
+            v = _dn_to_ndvi(nir[i, j], red[i, j])
+            t_ok = _lst_valid(t)
+            v_ok = _ndvi_valid(v)
+            lst_out[i, j] = t if t_ok else np.nan
+            ndvi_out[i, j] = v if v_ok else np.nan
+            if t_ok and v_ok:
+                # Sums use the float32-rounded values, matching the stored arrays
+                x = np.float64(lst_out[i, j])
+                y = np.float64(ndvi_out[i, j])
+                sx += x
+                sy += y
+                sxx += x * x
+                syy += y * y
+                sxy += x * y
+                n += 1
+    return sx, sy, sxx, syy, sxy, n
+
+
+def _build_lut(cmap_name):
+    """
+    Resolve a matplotlib colormap into a (256, 4) uint8 RGBA lookup table.
+    """
+    return (matplotlib.colormaps[cmap_name](np.linspace(0, 1, 256)) * 255).astype(np.uint8)
+
+
+# Colormap LUTs and display clipping, resolved once at import time
+_LST_CMAP_LUT = _build_lut('RdYlBu_r')  # Red (hot) to Blue (cool)
+_NDVI_CMAP_LUT = _build_lut('RdYlGn')  # Red = bare, Green = vegetation
+# Clip extremes for better visualization: p2/p98 from a 2048-bin (~0.1 C) histogram.
+# The range spans every LST value the kernels can emit: the mask drops <= -100 C and
+# the largest uint16 DN maps to ~99.85 C. Anything outside falls back to nanpercentile.
+_LST_CLIP_QUANTILES = np.array([0.02, 0.98])
+_LST_HIST_RANGE = (-100.0, 100.0)
+_LST_HIST_BINS = 2048
+_NDVI_CLIP_RANGE = (-0.2, 0.8)  # Fixed, matches the legend in the UI
+
+
+# Largest overlay edge in pixels; Leaflet gains nothing from more detail
+_MAX_IMAGE_SIZE = 1024
+
+
+def _downsample(data_array, max_size=_MAX_IMAGE_SIZE):
+    """
+    Block-average the two spatial dims so neither exceeds max_size pixels.
+    NaN cells are skipped in the mean; all-NaN blocks stay NaN.
+    """
+    y_dim, x_dim = data_array.dims[-2:]
+    factor = -(-max(data_array.shape[-2:]) // max_size)  # ceil division
+    if factor <= 1:
+        return data_array
+    return data_array.coarsen({y_dim: factor, x_dim: factor}, boundary='trim').mean()
+
+
+def _colorize(values, lut, vmin, vmax):
+    """
+    Map a float array onto an RGBA lookup table, NaN pixels become transparent.
+    """
+    nan_mask = np.isnan(values)
+    if vmax > vmin:
+        scale = 255.0 / (vmax - vmin)
+    else:
+        # Flat or all-NaN input: everything maps to the first LUT entry
+        vmin, scale = 0.0, 0.0
+    # One float32 scratch buffer, normalized and masked in place
+    idx = np.subtract(values, float(vmin), dtype=np.float32)
+    idx *= scale
+    np.clip(idx, 0, 255, out=idx)
+    idx[nan_mask] = 0
+    
+    rgba = lut[idx.astype(np.uint8)]
+    rgba[nan_mask, 3] = 0
+    return rgba
+
+
+# PIL encoder settings per supported output format
+IMAGE_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 85, 'method': 4},
+    # Low zlib level: the payload is re-encoded per request, speed matters more than size
+    'png': {'format': 'PNG', 'optimize': False, 'compress_level': 1},
+}
+
+
+def _encode_image(rgba, image_format):
+    """
+    Encode an RGBA array as raw image bytes in one of IMAGE_FORMATS.
+    """
+    buf = BytesIO()
+    Image.fromarray(rgba, 'RGBA').save(buf, **IMAGE_FORMATS[image_format])
+    return buf.getvalue()
+
+
+# fastmath without 'nnan': the reduction kernels rely on NaN checks surviving
+_NAN_SAFE_FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
+
+@njit(fastmath=_NAN_SAFE_FASTMATH, cache=True)
+def _minmax_meanstd(a):
+    """
+    Single streaming pass over a 1D array, skipping NaN.
+    Returns (min, max, sum, sum of squares, valid count).
+    """
+    mn = np.inf
+    mx = -np.inf
+    total = 0.0
+    total_sq = 0.0
+    count = 0
+    for k in range(a.size):
+        v = np.float64(a[k])  # accumulate in double precision
+        if np.isnan(v):
+            continue
+        if v < mn:
+            mn = v
+        if v > mx:
+            mx = v
+        total += v
+        total_sq += v * v
+        count += 1
+    return mn, mx, total, total_sq, count
+
+
+@njit(parallel=True, cache=True)
+def _hist_quantiles(a, lo, hi, bins, qs, n_chunks):
+    """
+    Approximate NaN-skipping quantiles of a 1D array from a histogram over [lo, hi).
+    One histogram per chunk (n_chunks ~ thread count) is built in parallel and
+    reduced; each quantile is interpolated linearly inside its bin. Values outside
+    the range are counted separately as under/overflow, and a quantile that falls
+    among them is returned as NaN. Returns (quantiles, valid count).
+    """
+    chunk = (a.size + n_chunks - 1) // n_chunks
+    scale = bins / (hi - lo)
+    hist = np.zeros((n_chunks, bins), dtype=np.int64)
+    under = np.zeros(n_chunks, dtype=np.int64)
+    over = np.zeros(n_chunks, dtype=np.int64)
+    for c in prange(n_chunks):
+        start = c * chunk
+        stop = min(start + chunk, a.size)
+        for k in range(start, stop):
+            v = a[k]
+            if np.isnan(v):
+                continue
+            if v < lo:
+                under[c] += 1
+                continue
+            b = int((v - lo) * scale)
+            if b >= bins:
+                over[c] += 1
+                continue
+            hist[c, b] += 1
+    
+    counts = np.zeros(bins, dtype=np.int64)
+    for c in range(n_chunks):
+        for b in range(bins):
+            counts[b] += hist[c, b]
+    n_under = under.sum()
+    total = n_under + counts.sum() + over.sum()
+    
+    out = np.full(qs.size, np.nan)
+    if total == 0:
+        return out, total
+    width = (hi - lo) / bins
+    for i in range(qs.size):
+        target = qs[i] * total
+        if target <= n_under:
+            continue
+        cum = n_under
+        for b in range(bins):
+            if counts[b] > 0 and cum + counts[b] >= target:
+                out[i] = lo + (b + (target - cum) / counts[b]) * width
+                break
+            cum += counts[b]
+    return out, total
+
+
+def _lst_clip_range(values):
+    """
+    Display clip values (p2, p98) for an LST array via _hist_quantiles, falling
+    back to an exact np.nanpercentile when a quantile lands outside the histogram
+    range. Returns (nan, nan) if nothing is valid.
+    """
+    lo, hi = _LST_HIST_RANGE
+    flat = values.ravel()
+    qs, total = _hist_quantiles(flat, lo, hi, _LST_HIST_BINS, _LST_CLIP_QUANTILES, get_num_threads())
+    if total > 0 and np.isnan(qs).any():
+        qs = np.nanpercentile(flat, _LST_CLIP_QUANTILES * 100)
+    return qs[0], qs[1]
+
+
+@njit(fastmath=_NAN_SAFE_FASTMATH, cache=True)
+def _pearson(x, y):
+    """
+    Single-pass Pearson correlation of two 1D arrays using Welford's online
+    co-moment updates, skipping pairs where either value is NaN.
+    Returns (r, n); r is 0.0 when fewer than two pairs are valid or either
+    input has zero variance.
+    """
+    if x.size != y.size:
+        raise ValueError("x and y must have the same number of elements.")
+    n = 0
+    mean_x = 0.0
+    mean_y = 0.0
+    c_xx = 0.0
+    c_yy = 0.0
+    c_xy = 0.0
+    for k in range(x.size):
+        xv = np.float64(x[k])
+        yv = np.float64(y[k])
+        if np.isnan(xv) or np.isnan(yv):
+            continue
+        n += 1
+        dx = xv - mean_x
+        dy = yv - mean_y
+        mean_x += dx / n
+        mean_y += dy / n
+        c_xx += dx * (xv - mean_x)
+        c_yy += dy * (yv - mean_y)
+        c_xy += dx * (yv - mean_y)
+    if n < 2 or not c_xx * c_yy > 0:
+        return 0.0, n
+    return c_xy / np.sqrt(c_xx * c_yy), n
+
+
+def _quantiles(values, count, qs):
+    """
+    Linear-interpolated quantiles (same as np.percentile) from one np.partition call.
+    NaNs are partitioned to the end, so the first `count` slots hold the valid values.
+    """
+    positions = [(count - 1) * q for q in qs]
+    kth = sorted({int(np.floor(pos)) for pos in positions} |
+                 {min(int(np.floor(pos)) + 1, count - 1) for pos in positions})
+    part = np.partition(values, kth)
+    
+    result = []
+    for pos in positions:
+        lo = int(np.floor(pos))
+        hi = min(lo + 1, count - 1)
+        result.append(part[lo] + (part[hi] - part[lo]) * (pos - lo))
+    return result
+
+
+# Per-thread staging buffers for the fused scene kernel, so back-to-back
+# requests for the same bbox reuse memory instead of reallocating it.
+# Only buffers up to _MAX_POOLED_BYTES are kept, so each thread holds at
+# most a few tens of MB however large the bboxes it has served.
+_buf_pool = threading.local()
+_MAX_POOLED_BYTES = 32 * 2**20
+
+
+def _get_buf(tag, shape, dtype=np.float32):
+    """
+    Return this thread's buffer for `tag`, reallocated only when shape or dtype change.
+    Only one buffer is kept per tag, so a new bbox replaces the previous one;
+    buffers over _MAX_POOLED_BYTES are allocated fresh and never pooled.
+    """
+    bufs = getattr(_buf_pool, 'bufs', None)
+    if bufs is None:
+        bufs = _buf_pool.bufs = {}
+    buf = bufs.get(tag)
+    if buf is not None and buf.shape == shape and buf.dtype == dtype:
+        return buf
+    buf = np.empty(shape, dtype=dtype)
+    if buf.nbytes <= _MAX_POOLED_BYTES:
+        bufs[tag] = buf
+    else:
+        bufs.pop(tag, None)
+    return buf
+
+
+def _check_dn_dtype(band):
+    """
+    Reject bands that are not uint16 DN values (e.g. a float load with NaN nodata)
+    rather than casting them, since truncating them would yield plausible-looking
+    but wrong LST/NDVI. Only reads the dtype, so lazy bands are not computed.
+    """
+    if band.dtype != np.uint16:
+        raise ValueError(
+            f"Band '{band.name}' must hold uint16 Landsat Collection 2 DN values, got {band.dtype}."
+        )
+
+
+def _as_rows(band):
+    """
+    Return the band's raw DN values as a contiguous 2D (rows, cols) uint16 array.
+    """
+    _check_dn_dtype(band)
+    values = np.ascontiguousarray(band.values)
+    return values.reshape(-1, values.shape[-1])
+
+
+def warm_up_kernels():
+    """
+    Run every Numba kernel in this module once on a tiny synthetic scene so
+    compilation (or loading from the on-disk cache) happens at startup, not on
+    the first request. The bbox kernels in src.utils have their own warm-up.
+    """
+    dn = np.full((8, 8), 30000, dtype=np.uint16)
+    bands = {'lwir': dn, 'nir': dn, 'red': dn}
+    
+    lst = calculate_lst(bands)
+    ndvi = calculate_ndvi(bands)
+    _lst_ndvi_corr(dn, dn, dn, np.empty_like(lst), np.empty_like(ndvi))
+    _minmax_meanstd(lst.ravel())
+    _pearson(lst.ravel(), ndvi.ravel())
+    _lst_clip_range(lst)
+
+
+def extract_bands(scene):
+    """
+    Read the bands used by the LST/NDVI kernels once, as contiguous 2D arrays.
+    
+    Parameters:
+    -----------
+    scene : xarray.Dataset
+        Scene containing 'lwir11', 'nir08' and 'red' bands (may be dask-backed)
+        
+    Returns:
+    --------
+    dict : {'lwir': ndarray, 'nir': ndarray, 'red': ndarray}
+        Raw DN values, C-contiguous, shape (rows, cols)
     """
-    if 'lwir11' not in ds:
+    if 'lwir11' not in scene:
         raise ValueError("Dataset must contain 'lwir11' band for LST calculation.")
+    if 'nir08' not in scene or 'red' not in scene:
+        raise ValueError("Dataset must contain 'nir08' and 'red' bands.")
     
-    # Convert to float for calculation
-    st_band = ds.lwir11.astype('float32')
+    # Validate dtypes on the lazy bands so a bad load fails before any COG I/O
+    for name in ('lwir11', 'nir08', 'red'):
+        _check_dn_dtype(scene[name])
     
-    # Apply Scale Factor and Offset for Collection 2 Level 2
-    kelvin = st_band * 0.003418 + 149.0
-    celsius = kelvin - 273.15
+    # Read the three bands in one threaded dask pass so their COG tiles are
+    # fetched concurrently (no-op for in-memory data); other bands are never read
+    scene = scene[['lwir11', 'nir08', 'red']].compute(scheduler='threads', num_workers=4)
     
-    # Mask unreasonably low values which likely indicate no-data or background
-    # 0 DN translates to ~149K or -124C. Real earth temps rarely go below -90C.
-    celsius = celsius.where(celsius > -100)
+    return {
+        'lwir': _as_rows(scene.lwir11),
+        'nir': _as_rows(scene.nir08),
+        'red': _as_rows(scene.red)
+    }
+
+
+def _wrap(values, template):
+    """
+    Wrap a kernel output back into a DataArray with the template band's coords.
+    """
+    return xr.DataArray(values.reshape(template.shape), coords=template.coords, dims=template.dims)
+
+
+def calculate_lst(bands):
+    """
+    Calculates Land Surface Temperature in Celsius from Landsat Level 2 'lwir11' band.
+    Formula: Kelvin = DN * 0.003418 + 149.0
+    Celsius = Kelvin - 273.15
+    
+    Takes the dict from extract_bands() and returns a float32 ndarray of the
+    same shape; wrap it with the scene's coords only where they are needed.
+    """
+    # Scale/offset and the no-data mask come from _dn_to_celsius/_lst_valid
+    lwir = bands['lwir']
+    celsius = np.empty(lwir.shape, dtype=np.float32)
+    _lst_kernel(lwir, celsius)
     
     return celsius
 
 
-def calculate_ndvi(ds):
+def calculate_ndvi(bands):
     """
     Calculates NDVI (Normalized Difference Vegetation Index).
     Formula: (NIR - Red) / (NIR + Red)
-    """
-    if 'nir08' not in ds or 'red' not in ds:
-        raise ValueError("Dataset must contain 'nir08' and 'red' bands.")
-        
-    # Scale factors for Collection 2 Level 2 Surface Reflectance
-    # DN * 2.75e-5 - 0.2
-    
-    nir = ds.nir08.astype('float32') * 0.0000275 - 0.2
-    red = ds.red.astype('float32') * 0.0000275 - 0.2
     
-    # Avoid division by zero
-    ndvi = (nir - red) / (nir + red + 1e-6)
-    
-    # Clip to valid range [-1, 1] usually, but let's just leave it raw for inspection
-    # Mask invalid data
-    ndvi = ndvi.where(ndvi > -1.0).where(ndvi < 1.0)
+    Takes the dict from extract_bands() and returns a float32 ndarray of the
+    same shape; wrap it with the scene's coords only where they are needed.
+    """
+    # Scaling, the (epsilon-guarded) ratio and the [-1, 1] mask come from
+    # _dn_to_ndvi/_ndvi_valid, applied in a single pass over the raw DN values.
+    nir = bands['nir']
+    ndvi = np.empty(nir.shape, dtype=np.float32)
+    _ndvi_kernel(nir, bands['red'], ndvi)
     
     return ndvi
 
 
-def generate_lst_image(lst_array, dpi=150):
+def generate_lst_image(lst_array, image_format='webp'):
     """
-    Generate a PNG image from LST data with temperature color scale.
+    Generate a WebP/PNG image from LST data with temperature color scale.
+    Downsampled to at most 1024 px per side; NaN pixels are transparent.
     
     Parameters:
     -----------
     lst_array : xarray.DataArray
         Land Surface Temperature data in Celsius
-    dpi : int
-        Image resolution (default: 150)
+    image_format : str
+        'webp' (default) or 'png'
         
     Returns:
     --------
-    tuple : (base64_encoded_png, bounds)
-        - base64_encoded_png : str
+    tuple : (image_bytes, bounds)
+        - image_bytes : bytes, encoded WebP/PNG
         - bounds : [[minLat, minLon], [maxLat, maxLon]]
     """
     # Get data bounds - extract before image generation
@@ -109,53 +531,32 @@ def generate_lst_image(lst_array, dpi=150):
     
     print(f"LST Image bounds: {bounds}")
     
-    # Create figure
-    fig, ax = plt.subplots(figsize=(10, 10), dpi=dpi)
+    # Bounds above come from the full-resolution coords and still cover the same region
+    arr = _downsample(lst_array).values
     
-    # Use magma colormap (dark to bright) - good for temperature
-    # Clip extremes for better visualization
-    vmin = float(np.nanpercentile(lst_array.values, 2))
-    vmax = float(np.nanpercentile(lst_array.values, 98))
+    vmin, vmax = _lst_clip_range(arr)
     
-    # Plot without axes or labels
-    im = ax.imshow(
-        lst_array.values,
-        cmap='RdYlBu_r',  # Red (hot) to Blue (cool)
-        vmin=vmin,
-        vmax=vmax,
-        interpolation='bilinear',
-        aspect='auto'
-    )
+    rgba = _colorize(arr, _LST_CMAP_LUT, vmin, vmax)
+    image_bytes = _encode_image(rgba, image_format)
     
-    ax.axis('off')
-    plt.tight_layout(pad=0)
-    
-    # Convert to PNG bytes
-    buf = BytesIO()
-    plt.savefig(buf, format='png', bbox_inches='tight', pad_inches=0, transparent=True)
-    buf.seek(0)
-    plt.close(fig)
-    
-    # Encode as base64
-    img_base64 = base64.b64encode(buf.read()).decode('utf-8')
-    
-    return img_base64, bounds
+    return image_bytes, bounds
 
 
-def generate_ndvi_image(ndvi_array, dpi=150):
+def generate_ndvi_image(ndvi_array, image_format='webp'):
     """
-    Generate a PNG image from NDVI data with vegetation color scale.
+    Generate a WebP/PNG image from NDVI data with vegetation color scale.
+    Downsampled to at most 1024 px per side; NaN pixels are transparent.
     
     Parameters:
     -----------
     ndvi_array : xarray.DataArray
         NDVI data (-1 to 1)
-    dpi : int
-        Image resolution (default: 150)
+    image_format : str
+        'webp' (default) or 'png'
         
     Returns:
     --------
-    tuple : (base64_encoded_png, bounds)
+    tuple : (image_bytes, bounds)
     """
     # Get data bounds - extract before image generation
     coords = ndvi_array.coords
@@ -181,32 +582,11 @@ def generate_ndvi_image(ndvi_array, dpi=150):
     
     print(f"NDVI Image bounds: {bounds}")
     
-    # Create figure
-    fig, ax = plt.subplots(figsize=(10, 10), dpi=dpi)
-    
-    # Plot with RdYlGn colormap (Red = bare, Green = vegetation)
-    im = ax.imshow(
-        ndvi_array.values,
-        cmap='RdYlGn',
-        vmin=-0.2,
-        vmax=0.8,
-        interpolation='bilinear',
-        aspect='auto'
-    )
-    
-    ax.axis('off')
-    plt.tight_layout(pad=0)
-    
-    # Convert to PNG bytes
-    buf = BytesIO()
-    plt.savefig(buf, format='png', bbox_inches='tight', pad_inches=0, transparent=True)
-    buf.seek(0)
-    plt.close(fig)
-    
-    # Encode as base64
-    img_base64 = base64.b64encode(buf.read()).decode('utf-8')
+    vmin, vmax = _NDVI_CLIP_RANGE
+    rgba = _colorize(_downsample(ndvi_array).values, _NDVI_CMAP_LUT, vmin, vmax)
+    image_bytes = _encode_image(rgba, image_format)
     
-    return img_base64, bounds
+    return image_bytes, bounds
 
 
 def calculate_statistics(data_array):
@@ -222,11 +602,11 @@ def calculate_statistics(data_array):
     --------
     dict : Statistics dictionary
     """
-    # Remove NaN values for calculations
-    values = data_array.values.flatten()
-    valid_values = values[~np.isnan(values)]
+    # ravel() is a view for contiguous data; NaNs are skipped inside the kernels
+    values = data_array.values.ravel()
+    mn, mx, total, total_sq, count = _minmax_meanstd(values)
     
-    if len(valid_values) == 0:
+    if count == 0:
         return {
             'min': 0,
             'max': 0,
@@ -237,14 +617,18 @@ def calculate_statistics(data_array):
             'p75': 0
         }
     
+    mean = total / count
+    std = np.sqrt(max(total_sq / count - mean * mean, 0.0))
+    p25, median, p75 = _quantiles(values, count, (0.25, 0.5, 0.75))
+    
     stats = {
-        'min': float(np.min(valid_values)),
-        'max': float(np.max(valid_values)),
-        'mean': float(np.mean(valid_values)),
-        'median': float(np.median(valid_values)),
-        'std': float(np.std(valid_values)),
-        'p25': float(np.percentile(valid_values, 25)),
-        'p75': float(np.percentile(valid_values, 75))
+        'min': mn,
+        'max': mx,
+        'mean': mean,
+        'median': median,
+        'std': std,
+        'p25': p25,
+        'p75': p75
     }
     
     return stats
@@ -265,20 +649,56 @@ def lst_ndvi_correlation(lst_array, ndvi_array):
     --------
     float : Pearson correlation coefficient
     """
-    # Flatten arrays
-    lst_flat = lst_array.values.flatten()
-    ndvi_flat = ndvi_array.values.flatten()
+    if lst_array.shape != ndvi_array.shape:
+        raise ValueError(
+            f"LST and NDVI arrays must have the same shape, got {lst_array.shape} and {ndvi_array.shape}."
+        )
+    
+    # ravel() is a view for contiguous data; NaN pairs are skipped inside the kernel
+    correlation, _ = _pearson(lst_array.values.ravel(), ndvi_array.values.ravel())
+    
+    return float(correlation)
+
+
+def process_scene(scene, bands=None):
+    """
+    Calculate LST, NDVI and their correlation for a single scene in one pass.
+    
+    Parameters:
+    -----------
+    scene : xarray.Dataset
+        Scene containing 'lwir11', 'nir08' and 'red' bands
+    bands : dict, optional
+        Output of extract_bands(scene), if already extracted
+        
+    Returns:
+    --------
+    tuple : (lst, ndvi, correlation)
+        - lst : xarray.DataArray, LST in Celsius
+        - ndvi : xarray.DataArray, NDVI
+        - correlation : float, Pearson correlation coefficient between the two
+        
+    lst and ndvi are backed by per-thread staging buffers that the next
+    process_scene() call on the same thread overwrites; copy them to keep them longer.
+    """
+    if bands is None:
+        bands = extract_bands(scene)
     
-    # Remove NaN values
-    valid_mask = ~(np.isnan(lst_flat) | np.isnan(ndvi_flat))
-    lst_valid = lst_flat[valid_mask]
-    ndvi_valid = ndvi_flat[valid_mask]
+    lwir = bands['lwir']
+    lst_out = _get_buf('lst', lwir.shape)
+    ndvi_out = _get_buf('ndvi', lwir.shape)
+    sx, sy, sxx, syy, sxy, n = _lst_ndvi_corr(lwir, bands['nir'], bands['red'], lst_out, ndvi_out)
     
-    if len(lst_valid) < 2:
-        return 0.0
+    lst = _wrap(lst_out, scene.lwir11)
+    ndvi = _wrap(ndvi_out, scene.lwir11)
     
-    # Calculate correlation
-    correlation_matrix = np.corrcoef(lst_valid, ndvi_valid)
-    correlation = correlation_matrix[0, 1]
+    if n < 2:
+        return lst, ndvi, 0.0
     
-    return float(correlation)
+    denom = np.sqrt((n * sxx - sx * sx) * (n * syy - sy * sy))
+    if not denom > 0:
+        return lst, ndvi, 0.0
+    
+    correlation = (n * sxy - sx * sy) / denom
+    
+    return lst, ndvi, float(correlation)
@@ -1,10 +1,38 @@
 """
 Geospatial utilities for location search and geocoding
 """
+from math import cos, radians
+import os
+
 from geopy.geocoders import Nominatim
+import diskcache
+from numba import njit, prange
 import numpy as np
 
 
+# Shared geocoder client and on-disk cache of geocoding results, stored under
+# <project>/.cache/geo regardless of the working directory.
+# Only found locations are stored: misses are retried on the next call and
+# network errors raise out of the lookup functions, so neither is ever cached.
+_geolocator = Nominatim(user_agent="uhi_monitor_app_v2", timeout=10)
+_GEO_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'geo')
+_geo_cache = diskcache.Cache(_GEO_CACHE_DIR)
+_GEO_CACHE_EXPIRE = 30 * 86400  # 30 days
+
+
+def _cached_lookup(key, lookup, *args):
+    """
+    Return the cached result for `key`, or call lookup(*args) and cache it
+    unless it returned None.
+    """
+    result = _geo_cache.get(key)
+    if result is None:
+        result = lookup(*args)
+        if result is not None:
+            _geo_cache.set(key, result, expire=_GEO_CACHE_EXPIRE)
+    return result
+
+
 def get_city_coordinates(city_name):
     """
     Legacy function for backwards compatibility.
@@ -42,49 +70,58 @@ def search_locations(query, buffer_km=15):
         }
     """
     try:
-        geolocator = Nominatim(user_agent="uhi_monitor_app_v2", timeout=10)
-        location = geolocator.geocode(query, addressdetails=True)
-        
-        if not location:
-            return None
-        
-        lat, lon = location.latitude, location.longitude
-        
-        # Try to get bounding box from raw data
-        raw_bbox = location.raw.get('boundingbox')
-        
-        if raw_bbox:
-            # Nominatim returns [min_lat, max_lat, min_lon, max_lon]
-            min_lat, max_lat, min_lon, max_lon = [float(x) for x in raw_bbox]
-            bbox = [min_lon, min_lat, max_lon, max_lat]
-        else:
-            # Create bbox from center point with buffer
-            bbox = get_city_bbox(lat, lon, buffer_km)
-        
-        # Extract location name
-        address = location.raw.get('address', {})
-        name_parts = []
-        
-        # Build hierarchical name
-        for key in ['city', 'town', 'village', 'state', 'country']:
-            if key in address:
-                name_parts.append(address[key])
-        
-        name = ', '.join(name_parts) if name_parts else location.address.split(',')[0]
-        
-        return {
-            'name': name,
-            'lat': lat,
-            'lon': lon,
-            'bbox': bbox,
-            'display_name': location.address
-        }
+        # Normalize so equivalent queries share a cache entry
+        query = query.strip().lower()
+        return _cached_lookup(('search', query, buffer_km), _geocode, query, buffer_km)
         
     except Exception as e:
         print(f"Error searching location '{query}': {e}")
         return None
 
 
+def _geocode(query, buffer_km):
+    """
+    Forward geocoding behind search_locations() (cached by the caller).
+    """
+    location = _geolocator.geocode(query, addressdetails=True)
+    
+    if not location:
+        return None
+    
+    lat, lon = location.latitude, location.longitude
+    
+    # Try to get bounding box from raw data
+    raw_bbox = location.raw.get('boundingbox')
+    
+    if raw_bbox:
+        # Nominatim returns [min_lat, max_lat, min_lon, max_lon]
+        min_lat, max_lat, min_lon, max_lon = [float(x) for x in raw_bbox]
+        bbox = [min_lon, min_lat, max_lon, max_lat]
+    else:
+        # Create bbox from center point with buffer
+        bbox = get_city_bbox(lat, lon, buffer_km)
+    
+    # Extract location name
+    address = location.raw.get('address', {})
+    name_parts = []
+    
+    # Build hierarchical name
+    for key in ['city', 'town', 'village', 'state', 'country']:
+        if key in address:
+            name_parts.append(address[key])
+    
+    name = ', '.join(name_parts) if name_parts else location.address.split(',')[0]
+    
+    return {
+        'name': name,
+        'lat': lat,
+        'lon': lon,
+        'bbox': bbox,
+        'display_name': location.address
+    }
+
+
+@njit(cache=True, fastmath=True)
 def get_city_bbox(lat, lon, buffer_km=15):
     """
     Create a bounding box around a point with a given buffer.
@@ -107,7 +144,7 @@ def get_city_bbox(lat, lon, buffer_km=15):
     # 1 degree latitude ≈ 111 km everywhere
     # 1 degree longitude ≈ 111 km * cos(latitude)
     lat_buffer = buffer_km / 111.0
-    lon_buffer = buffer_km / (111.0 * np.cos(np.radians(lat)))
+    lon_buffer = buffer_km / (111.0 * cos(radians(lat)))
     
     bbox = [
         lon - lon_buffer,  # minLon
@@ -119,6 +156,37 @@ def get_city_bbox(lat, lon, buffer_km=15):
     return bbox
 
 
+@njit(parallel=True, cache=True, fastmath=True)
+def get_city_bboxes(lats, lons, buffer_km=15):
+    """
+    Vectorized get_city_bbox() for many points at once (e.g. autocomplete suggestions).
+    
+    Parameters:
+    -----------
+    lats : numpy.ndarray
+        Latitudes in degrees, shape (N,)
+    lons : numpy.ndarray
+        Longitudes in degrees, shape (N,)
+    buffer_km : float
+        Buffer distance in kilometers (default: 15km)
+        
+    Returns:
+    --------
+    numpy.ndarray
+        Shape (N, 4), rows of [minLon, minLat, maxLon, maxLat]
+    """
+    n = lats.shape[0]
+    bboxes = np.empty((n, 4), dtype=np.float64)
+    lat_buffer = buffer_km / 111.0
+    for i in prange(n):
+        lon_buffer = buffer_km / (111.0 * cos(radians(lats[i])))
+        bboxes[i, 0] = lons[i] - lon_buffer
+        bboxes[i, 1] = lats[i] - lat_buffer
+        bboxes[i, 2] = lons[i] + lon_buffer
+        bboxes[i, 3] = lats[i] + lat_buffer
+    return bboxes
+
+
 def reverse_geocode(lat, lon, buffer_km=15):
     """
     Reverse geocode coordinates to get location information.
@@ -138,33 +206,63 @@ def reverse_geocode(lat, lon, buffer_km=15):
         Same structure as search_locations()
     """
     try:
-        geolocator = Nominatim(user_agent="uhi_monitor_app_v2", timeout=10)
-        location = geolocator.reverse((lat, lon), addressdetails=True)
+        # Round to ~11 m so nearby clicks share a cache entry
+        key_lat, key_lon = round(float(lat), 4), round(float(lon), 4)
+        place = _cached_lookup(('reverse', key_lat, key_lon), _reverse, key_lat, key_lon)
         
-        if not location:
+        if not place:
             return None
         
         # Create bbox from coordinates
-        bbox = get_city_bbox(lat, lon, buffer_km)
+        bbox = get_city_bbox(float(lat), float(lon), buffer_km)
         
-        # Extract location name
-        address = location.raw.get('address', {})
-        name_parts = []
-        
-        for key in ['city', 'town', 'village', 'county', 'state', 'country']:
-            if key in address:
-                name_parts.append(address[key])
-        
-        name = ', '.join(name_parts[:3]) if name_parts else f"Location ({lat:.4f}, {lon:.4f})"
+        name, display_name = place
+        if not name:
+            name = f"Location ({lat:.4f}, {lon:.4f})"
         
         return {
             'name': name,
             'lat': lat,
             'lon': lon,
             'bbox': bbox,
-            'display_name': location.address
+            'display_name': display_name
         }
         
     except Exception as e:
         print(f"Error reverse geocoding ({lat}, {lon}): {e}")
         return None
+
+
+def _reverse(lat, lon):
+    """
+    Reverse geocoding behind reverse_geocode() (cached by the caller).
+    Returns (name, display_name) or None; name is empty if no address parts matched.
+    """
+    location = _geolocator.reverse((lat, lon), addressdetails=True)
+    
+    if not location:
+        return None
+    
+    # Extract location name
+    address = location.raw.get('address', {})
+    name_parts = []
+    
+    for key in ['city', 'town', 'village', 'county', 'state', 'country']:
+        if key in address:
+            name_parts.append(address[key])
+    
+    name = ', '.join(name_parts[:3])
+    
+    return name, location.address
+
+
+def warm_up_bbox_kernels():
+    """
+    Compile (or load from the on-disk cache) get_city_bbox and get_city_bboxes
+    for the argument types used at runtime, so the first search or reverse
+    geocode of a process does not pay the JIT cost.
+    """
+    get_city_bbox(0.0, 0.0, 15)
+    get_city_bbox(0.0, 0.0)
+    get_city_bboxes(np.zeros(1), np.zeros(1), 15)
+    get_city_bboxes(np.zeros(1), np.zeros(1))
@@ -292,28 +292,37 @@ async function handleAnalyze() {
             }),
         });
 
-        const result = await response.json();
-
-        if (!result.success) {
+        // Validation errors and "no data" come back as a single JSON document
+        if (!response.ok) {
+            const result = await response.json();
             showToast('Analysis Failed', result.error || 'Could not process data', 'error');
             hideLoading();
             return;
         }
 
-        state.analysisData = result.data;
-
-        updateLoadingText('Processing LST and NDVI...', 'Rendering visualization');
-
-        // Add layers to map
-        await addDataLayers(result.data);
-
-        // Update statistics panel
-        updateStatsPanel(result.data);
+        state.analysisData = {};
+        clearDataLayers();
 
-        // Show stats panel
-        document.getElementById('stats-panel').style.display = 'block';
+        // Each stage is rendered as soon as its line arrives
+        let completed = false;
+        for await (const message of readNdjson(response)) {
+            if (message.stage === 'error') {
+                showToast('Analysis Failed', message.error || 'Could not process data', 'error');
+                hideLoading();
+                return;
+            }
+            if (message.stage === 'done') {
+                completed = true;
+            }
+            handleAnalysisStage(message);
+        }
 
         hideLoading();
+        // A stream that ends without 'done' was cut off mid-analysis
+        if (!completed) {
+            showToast('Analysis Failed', 'Connection closed before the analysis finished', 'error');
+            return;
+        }
         showToast('Analysis Complete', 'LST and NDVI layers added to map', 'success');
 
     } catch (error) {
@@ -323,45 +332,107 @@ async function handleAnalyze() {
     }
 }
 
+async function* readNdjson(response) {
+    // Yield one parsed object per newline-delimited JSON line of a streamed response
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += value;
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+
+        for (const line of lines) {
+            if (line.trim()) {
+                yield JSON.parse(line);
+            }
+        }
+    }
+
+    if (buffer.trim()) {
+        yield JSON.parse(buffer);
+    }
+}
+
+function handleAnalysisStage(message) {
+    const { stage, ...payload } = message;
+
+    switch (stage) {
+        case 'scene':
+            Object.assign(state.analysisData, payload);
+            updateSceneInfo(state.analysisData);
+            updateLoadingText('Processing LST and NDVI...', `Scene from ${payload.scene_date}`);
+            break;
+
+        case 'lst':
+            state.analysisData.lst = payload;
+            state.analysisData.uhi_magnitude = payload.uhi_magnitude;
+            addDataLayer('lst', payload);
+            // Fit bounds
+            state.map.fitBounds(payload.bounds, { padding: [50, 50] });
+            updateLstStats(state.analysisData);
+            document.getElementById('stats-panel').style.display = 'block';
+            // The LST overlay is ready, let the user see the map while NDVI finishes
+            hideLoading();
+            break;
+
+        case 'ndvi':
+            state.analysisData.ndvi = payload;
+            addDataLayer('ndvi', payload);
+            updateNdviStats(state.analysisData);
+            break;
+
+        case 'correlation':
+            state.analysisData.correlation = payload.correlation;
+            updateCorrelation(state.analysisData);
+            break;
+
+        default:
+            break;
+    }
+}
+
 // ====================================
 // Data Layer Management
 // ====================================
 
-async function addDataLayers(data) {
+function clearDataLayers() {
     // Remove existing layers
     if (state.lstLayer) {
         state.map.removeLayer(state.lstLayer);
+        state.lstLayer = null;
     }
     if (state.ndviLayer) {
         state.map.removeLayer(state.ndviLayer);
+        state.ndviLayer = null;
     }
+    // Hide the previous region's stats until the new LST stage arrives
+    document.getElementById('stats-panel').style.display = 'none';
+    updateLegend();
+}
 
+function addDataLayer(kind, layerData) {
     const opacity = document.getElementById('layer-opacity').value / 100;
 
-    // Add LST layer
-    const lstImageUrl = `data:image/png;base64,${data.lst.image}`;
-    state.lstLayer = L.imageOverlay(lstImageUrl, data.lst.bounds, {
+    const imageUrl = `${API_BASE}${layerData.image_url}`;
+    const layer = L.imageOverlay(imageUrl, layerData.bounds, {
         opacity: opacity,
         interactive: false,
     });
 
-    // Add NDVI layer
-    const ndviImageUrl = `data:image/png;base64,${data.ndvi.image}`;
-    state.ndviLayer = L.imageOverlay(ndviImageUrl, data.ndvi.bounds, {
-        opacity: opacity,
-        interactive: false,
-    });
+    if (kind === 'lst') {
+        state.lstLayer = layer;
+    } else {
+        state.ndviLayer = layer;
+    }
 
     // Add to map (check toggles)
-    if (document.getElementById('toggle-lst').checked) {
-        state.lstLayer.addTo(state.map);
+    if (document.getElementById(`toggle-${kind}`).checked) {
+        layer.addTo(state.map);
     }
-    if (document.getElementById('toggle-ndvi').checked) {
-        state.ndviLayer.addTo(state.map);
-    }
-
-    // Fit bounds
-    state.map.fitBounds(data.lst.bounds, { padding: [50, 50] });
 
     // Update legend
     updateLegend();
@@ -371,24 +442,29 @@ async function addDataLayers(data) {
 // Statistics Panel
 // ====================================
 
-function updateStatsPanel(data) {
-    // Scene info
+function updateSceneInfo(data) {
     document.getElementById('scene-date').textContent = data.scene_date;
     document.getElementById('cloud-cover').textContent = `${data.cloud_cover.toFixed(1)}%`;
+}
 
-    // LST statistics
+function updateLstStats(data) {
     document.getElementById('lst-min').textContent = `${data.lst.statistics.min.toFixed(1)}°C`;
     document.getElementById('lst-max').textContent = `${data.lst.statistics.max.toFixed(1)}°C`;
     document.getElementById('lst-mean').textContent = `${data.lst.statistics.mean.toFixed(1)}°C`;
     document.getElementById('lst-std').textContent = `${data.lst.statistics.std.toFixed(1)}°C`;
 
-    // NDVI statistics
+    // UHI Magnitude
+    document.getElementById('uhi-magnitude').textContent = `${data.uhi_magnitude.toFixed(1)}°C`;
+}
+
+function updateNdviStats(data) {
     document.getElementById('ndvi-min').textContent = data.ndvi.statistics.min.toFixed(3);
     document.getElementById('ndvi-max').textContent = data.ndvi.statistics.max.toFixed(3);
     document.getElementById('ndvi-mean').textContent = data.ndvi.statistics.mean.toFixed(3);
     document.getElementById('ndvi-std').textContent = data.ndvi.statistics.std.toFixed(3);
+}
 
-    // Correlation
+function updateCorrelation(data) {
     const correlation = data.correlation;
     document.getElementById('correlation').textContent = correlation.toFixed(3);
 
@@ -412,9 +488,6 @@ function updateStatsPanel(data) {
         'Higher vegetation leads to higher temperature');
 
     document.getElementById('correlation-text').textContent = interpretation;
-
-    // UHI Magnitude
-    document.getElementById('uhi-magnitude').textContent = `${data.uhi_magnitude.toFixed(1)}°C`;
 }
 
 // ====================================